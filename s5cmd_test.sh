@@ -50,8 +50,9 @@ function download_small_files() {
     echo "Downloading all small files..."
     start_time=$(date +%s)
     
+    # Small files are sharded across shard=0..f/ prefixes; flatten them locally
     s5cmd --endpoint-url="$AWS_ENDPOINT_URL" \
-          cp "s3://$BUCKET/small_file_*.txt" "$DATA_DIR/"
+          cp --flatten "s3://$BUCKET/shard=*/small_file_*.txt" "$DATA_DIR/"
     
     end_time=$(date +%s)
     duration=$((end_time - start_time))
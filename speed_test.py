@@ -18,15 +18,64 @@
 
 
 import os
+import io
+import errno
 import time
+import asyncio
 import boto3
+from botocore.config import Config
+from botocore.credentials import Credentials
+from botocore.session import get_session
+from botocore.exceptions import ClientError
+from botocore.awsrequest import AWSHTTPSConnection
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from s3transfer.subscribers import BaseSubscriber
+from s3transfer.utils import ReadFileChunk
 import random
-import string
 import argparse
-from concurrent.futures import ThreadPoolExecutor
+import statistics
+import threading
+from functools import lru_cache
+from http.client import HTTPConnection
+import urllib3.connection
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from tqdm import tqdm
 import hashlib
+import json
+import mmap
 import shutil
+import tarfile
+
+# Prefer SIMD-accelerated BLAKE3 for integrity checks, falling back to
+# OpenSSL-backed SHA-256 when the blake3 package isn't installed
+try:
+    from blake3 import blake3 as _hasher
+    HASH_NAME = 'BLAKE3'
+except ImportError:
+    _hasher = None
+    HASH_NAME = 'SHA-256'
+
+# Small-file transfers run on asyncio when aioboto3 is installed, falling back
+# to a thread pool over the shared transfer manager otherwise
+try:
+    import aioboto3
+    from aiobotocore.config import AioConfig
+    from tqdm.asyncio import tqdm as async_tqdm
+except ImportError:
+    aioboto3 = None
+
+# The large file goes through the AWS Common Runtime (native multipart) when
+# awscrt is installed, e.g. via `pip install boto3[crt]`
+try:
+    from s3transfer.crt import (
+        BotocoreCRTCredentialsWrapper,
+        BotocoreCRTRequestSerializer,
+        CRTTransferManager,
+        create_s3_crt_client,
+    )
+except ImportError:
+    CRTTransferManager = None
 
 # Check required environment variables
 required_vars = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_ENDPOINT_URL', 'AWS_REGION']
@@ -48,10 +97,26 @@ S3_CONFIG = {
 
 BUCKET_NAME = 'dkh-test'
 DATA_DIR = 'data'
+HASH_CACHE_PATH = os.path.join(DATA_DIR, '.hashes.json')
+PART_HASH_CACHE_PATH = os.path.join(DATA_DIR, '.part_hashes.json')
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  # S3 minimum for every part but the last
+BIG_SOCKET_BUFFER_SIZE = 1 * MB
+HEDGE_CHECK_INTERVAL = 0.5  # seconds between straggler scans
+HEDGE_SLOWDOWN = 2  # reissue parts running longer than this multiple of the median
 LARGE_FILE_SIZE = 1 * 1024 * 1024 * 1024  # 1GB
+DEFAULT_PART_SIZE_MB = 50
+DEFAULT_CONCURRENCY = 32
+DEFAULT_TARGET_GBPS = 10
 SMALL_FILE_COUNT = 10000
 SMALL_FILE_SIZE_MIN = 2
 SMALL_FILE_SIZE_MAX = 512
+SMALL_FILE_ASYNC_CONCURRENCY = 128
+SMALL_FILE_PROGRESS_BATCH = 256
+# Redraw progress bars at most twice a second, and not at all when output
+# isn't a terminal (tqdm's disable=None)
+PROGRESS_OPTIONS = {'mininterval': 0.5, 'disable': None}
+PACKED_SMALL_FILES_KEY = 'small_files.tar'
 
 def parse_args():
     """Parse command line arguments"""
@@ -68,10 +133,45 @@ def parse_args():
                        help='Number of times to repeat large file download (default: 1)')
     parser.add_argument('--list', action='store_true', help='List objects in bucket')
     parser.add_argument('--query', type=str, help='Optional metadata query for listing (e.g. "`Content-Type` = \'text/plain\'")')
+    parser.add_argument('--metadata', action='store_true',
+                       help='Fetch content type and user metadata for each listed object')
     parser.add_argument('--replace-original', action='store_true', 
                        help='Replace original files with downloaded ones')
+    parser.add_argument('--modified', action='store_true',
+                       help='Patch the existing large file in place on --create and upload only changed parts')
+    parser.add_argument('--pack', action='store_true',
+                       help='Transfer small files as a single tar archive object')
+    parser.add_argument('--multiprocess', action='store_true',
+                       help='Transfer the large file with ranged requests across worker processes')
+    parser.add_argument('--hedge', action='store_true',
+                       help='Download the large file with ranged GETs, reissuing straggling parts')
+    parser.add_argument('--target-gbps', type=float, default=DEFAULT_TARGET_GBPS,
+                       help=f'Throughput target for the AWS CRT transfer client in Gbps (default: {DEFAULT_TARGET_GBPS})')
+    parser.add_argument('--big-socket-buf', action='store_true',
+                       help='Send request bodies in 1MB blocks instead of 8-16KB')
+    parser.add_argument('--part-size-mb', type=int, default=DEFAULT_PART_SIZE_MB,
+                       help=f'Multipart chunk size in MB (default: {DEFAULT_PART_SIZE_MB})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                       help=f'Number of concurrent multipart transfer threads (default: {DEFAULT_CONCURRENCY})')
     return parser.parse_args()
 
+def enable_big_socket_buffer(size=BIG_SOCKET_BUFFER_SIZE):
+    """Raise the HTTP connection send block size used for request bodies"""
+    # Must run before any client opens a connection. http.client takes
+    # blocksize positionally; urllib3 2.x takes it keyword-only.
+    HTTPConnection.__init__.__defaults__ = tuple(
+        size if x == 8192 else x for x in HTTPConnection.__init__.__defaults__
+    )
+    # HTTPSConnection declares its own blocksize default and passes it to its
+    # parent explicitly, so both classes need patching
+    for connection_class in (urllib3.connection.HTTPConnection, urllib3.connection.HTTPSConnection):
+        kwdefaults = connection_class.__init__.__kwdefaults__
+        if kwdefaults and 'blocksize' in kwdefaults:
+            kwdefaults['blocksize'] = size
+    # botocore's HTTPS connections are what actually talk to the endpoint
+    if AWSHTTPSConnection('localhost').blocksize != size:
+        print("Warning: --big-socket-buf could not raise the HTTPS connection block size")
+
 def ensure_data_directory():
     """Create data directory if it doesn't exist"""
     if not os.path.exists(DATA_DIR):
@@ -79,7 +179,7 @@ def ensure_data_directory():
 
 def generate_random_content(size):
     """Generate random content of specified size"""
-    return ''.join(random.choices(string.ascii_letters + string.digits, k=size)).encode()
+    return os.urandom(size)
 
 def create_large_file(filename, size):
     """Create a large file with random content"""
@@ -90,7 +190,7 @@ def create_large_file(filename, size):
     written = 0
     
     with open(filepath, 'wb') as f:
-        with tqdm(total=size, unit='B', unit_scale=True) as pbar:
+        with tqdm(total=size, unit='B', unit_scale=True, miniters=64 * MB, **PROGRESS_OPTIONS) as pbar:
             while written < size:
                 remaining = min(chunk_size, size - written)
                 f.write(generate_random_content(remaining))
@@ -99,45 +199,266 @@ def create_large_file(filename, size):
     
     return filepath
 
+def mutate_large_file(filepath, n_patches=16, patch_size=4096):
+    """Overwrite a few random blocks of an existing file in place"""
+    print(f"Patching {n_patches} x {patch_size} bytes of {filepath}...")
+    with open(filepath, 'r+b') as f:
+        size = os.fstat(f.fileno()).st_size
+        patch_size = min(patch_size, size)
+        for _ in range(n_patches):
+            f.seek(random.randrange(size - patch_size + 1))
+            f.write(generate_random_content(patch_size))
+    return filepath
+
+class RandomSource(io.RawIOBase):
+    """Unseekable file-like that yields random bytes, hashing them as they are read"""
+    def __init__(self, size, h):
+        self.remaining = size
+        self.h = h
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        # Follow the RawIOBase contract: a negative size reads to EOF
+        n = self.remaining if n is None or n < 0 else min(n, self.remaining)
+        if n == 0:
+            return b''
+        self.remaining -= n
+        chunk = generate_random_content(n)
+        self.h.update(chunk)
+        return chunk
+
+def streams_large_upload(args):
+    """Whether the large file should be streamed to S3 without touching disk"""
+    return args.create and args.upload and args.large and not (args.multiprocess or args.modified)
+
 def create_small_files():
     """Create multiple small files with random content"""
     print(f"Generating {SMALL_FILE_COUNT} small files...")
     files = []
-    for i in tqdm(range(SMALL_FILE_COUNT)):
-        size = random.randint(SMALL_FILE_SIZE_MIN, SMALL_FILE_SIZE_MAX)
-        filename = f'small_file_{i}.txt'
-        filepath = os.path.join(DATA_DIR, filename)
-        with open(filepath, 'wb') as f:
-            f.write(generate_random_content(size))
-        files.append(filepath)
+    with tqdm(total=SMALL_FILE_COUNT, **PROGRESS_OPTIONS) as pbar:
+        for batch_start in range(0, SMALL_FILE_COUNT, SMALL_FILE_PROGRESS_BATCH):
+            batch = range(batch_start, min(batch_start + SMALL_FILE_PROGRESS_BATCH, SMALL_FILE_COUNT))
+            for i in batch:
+                size = random.randint(SMALL_FILE_SIZE_MIN, SMALL_FILE_SIZE_MAX)
+                filename = f'small_file_{i}.txt'
+                filepath = os.path.join(DATA_DIR, filename)
+                with open(filepath, 'wb') as f:
+                    f.write(generate_random_content(size))
+                files.append(filepath)
+            pbar.update(len(batch))
     return files
 
-def get_s3_client():
-    """Create and return an S3 client"""
-    return boto3.client('s3', **S3_CONFIG)
+def get_transfer_config(args):
+    """Build a multipart TransferConfig tuned for large object throughput"""
+    return TransferConfig(
+        multipart_threshold=8 * MB,
+        multipart_chunksize=args.part_size_mb * MB,
+        max_concurrency=args.concurrency,
+        max_io_queue=10000,
+        io_chunksize=1 * MB,
+        use_threads=True,
+    )
+
+@lru_cache(maxsize=1)
+def _create_s3_client(max_pool_connections):
+    """Create the S3 client once; boto3 low-level clients are thread-safe"""
+    # Keep-alive plus a pool large enough for every transfer thread, so
+    # small-file requests reuse TLS connections instead of reconnecting
+    config = Config(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=True,
+        retries={'mode': 'adaptive', 'max_attempts': 10},
+        s3={'use_accelerate_endpoint': False},
+    )
+    return boto3.client('s3', config=config, **S3_CONFIG)
+
+def get_s3_client(args):
+    """Return the shared S3 client, creating it on first use"""
+    return _create_s3_client(max(32, args.concurrency * 2))
+
+def get_transfer_manager(args):
+    """Create a transfer manager on top of the shared S3 client"""
+    return create_transfer_manager(get_s3_client(args), get_transfer_config(args))
 
-def upload_file(s3_client, filepath):
-    """Upload a single file to S3"""
-    filename = os.path.basename(filepath)
-    s3_client.upload_file(filepath, BUCKET_NAME, filename)
-    return filename
+def _shard_key(i):
+    """Return the S3 key for small file i, spread over 16 prefixes"""
+    # S3 scales request rate per prefix, so a flat namespace caps throughput
+    return f'shard={i & 0xF:x}/small_file_{i}.txt'
 
-def calculate_md5(filepath, chunk_size=8192):
-    """Calculate MD5 hash of a file"""
-    md5 = hashlib.md5()
+def use_crt(args):
+    """Whether the large file should use the AWS CRT transfer manager"""
+    # The CRT client always connects over TLS, so plain-http endpoints
+    # (e.g. a local S3 server) stay on the s3transfer path
+    return (CRTTransferManager is not None
+            and urlparse(S3_CONFIG['endpoint_url']).scheme == 'https'
+            and not (args.multiprocess or args.hedge))
+
+def get_crt_transfer_manager(args):
+    """Create an AWS CRT transfer manager for the configured endpoint"""
+    credentials = Credentials(S3_CONFIG['aws_access_key_id'], S3_CONFIG['aws_secret_access_key'])
+    crt_client = create_s3_crt_client(
+        region=S3_CONFIG['region_name'],
+        crt_credentials_provider=BotocoreCRTCredentialsWrapper(credentials).to_crt_credentials_provider(),
+        target_throughput=int(args.target_gbps * 1e9 / 8),
+        part_size=args.part_size_mb * MB,
+    )
+    # The serializer only builds requests; the CRT client signs and sends them.
+    # It adds unsigned-config keys to client_kwargs in place, so hand it a copy.
+    serializer = BotocoreCRTRequestSerializer(get_session(), client_kwargs=dict(S3_CONFIG))
+    return CRTTransferManager(crt_client, serializer)
+
+def crt_upload_file(args, filepath):
+    """Upload a single file through the AWS CRT transfer manager"""
+    key = os.path.basename(filepath)
+    with get_crt_transfer_manager(args) as crt_manager:
+        crt_manager.upload(filepath, BUCKET_NAME, key).result()
+    return key
+
+def crt_download_file(crt_manager, filename, replace_original=False):
+    """Download a single file through the AWS CRT transfer manager, returning its path"""
+    download_path = get_download_path(filename, replace_original)
+    crt_manager.download(BUCKET_NAME, filename, download_path).result()
+    return download_path
+
+def upload_file(transfer_manager, filepath, key=None):
+    """Upload a single file to S3, keyed by its filename unless key is given"""
+    key = key or os.path.basename(filepath)
+    transfer_manager.upload(filepath, BUCKET_NAME, key).result()
+    return key
+
+def new_hasher():
+    """Return a fresh hash object for integrity checks"""
+    if _hasher is not None:
+        return _hasher()
+    return hashlib.sha256()
+
+def calculate_hash(filepath, chunk_size=4 * MB):
+    """Calculate the integrity hash of a file"""
     with open(filepath, 'rb') as f:
+        if _hasher is None and hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        h = new_hasher()
         while True:
             chunk = f.read(chunk_size)
             if not chunk:
                 break
-            md5.update(chunk)
-    return md5.hexdigest()
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_hash_cache():
+    """Load cached source file hashes, keyed by filename"""
+    if not os.path.exists(HASH_CACHE_PATH):
+        return {}
+    with open(HASH_CACHE_PATH) as f:
+        cache = json.load(f)
+    # Hashes from a different algorithm can't be compared
+    if cache.get('algorithm') != HASH_NAME:
+        return {}
+    return cache.get('files', {})
+
+def save_hash_cache(cache):
+    """Persist source file hashes next to the test data"""
+    with open(HASH_CACHE_PATH, 'w') as f:
+        json.dump({'algorithm': HASH_NAME, 'files': cache}, f)
+
+def invalidate_hash_cache(filenames):
+    """Drop cached hashes for files that are about to be regenerated"""
+    cache = load_hash_cache()
+    if cache:
+        for filename in filenames:
+            cache.pop(filename, None)
+        save_hash_cache(cache)
+
+def load_part_hashes(key):
+    """Load the part layout recorded by the last delta upload of key, if any"""
+    if not os.path.exists(PART_HASH_CACHE_PATH):
+        return None
+    with open(PART_HASH_CACHE_PATH) as f:
+        entry = json.load(f).get(key)
+    if not entry or entry.get('algorithm') != HASH_NAME:
+        return None
+    return entry
+
+def save_part_hashes(key, entry):
+    """Record (or with entry=None, forget) the uploaded part layout of key"""
+    cache = {}
+    if os.path.exists(PART_HASH_CACHE_PATH):
+        with open(PART_HASH_CACHE_PATH) as f:
+            cache = json.load(f)
+    if entry is None:
+        if key not in cache:
+            return
+        cache.pop(key)
+    else:
+        cache[key] = dict(entry, algorithm=HASH_NAME)
+    with open(PART_HASH_CACHE_PATH, 'w') as f:
+        json.dump(cache, f)
+
+def verify_file_integrity(filename, downloaded_hash, cache):
+    """Verify file integrity by comparing the cached source hash to a downloaded hash"""
+    original_hash = cache.get(filename)
+    if original_hash is None:
+        original_hash = calculate_hash(os.path.join(DATA_DIR, filename))
+    return original_hash == downloaded_hash
+
+class HashingWriter:
+    """File-like wrapper that hashes bytes as they are written"""
+    def __init__(self, fh, h, size=None):
+        self.fh = fh
+        self.h = h
+        self.size = size
+        self.written = 0
+
+    def write(self, b):
+        # A fixed-size target (e.g. a memory map) can't take more than size bytes
+        if self.size is not None and self.written + len(b) > self.size:
+            raise ValueError(f"Object grew past the {self.size} bytes allocated for it during download")
+        self.h.update(b)
+        self.written += len(b)
+        return self.fh.write(b)
+
+class ProvideSizeSubscriber(BaseSubscriber):
+    """Hands the transfer manager a known object size so it skips its own HeadObject"""
+    def __init__(self, size):
+        self.size = size
+
+    def on_queued(self, future, **kwargs):
+        future.meta.provide_transfer_size(self.size)
+
+def scan_small_files(directory=DATA_DIR):
+    """Return {filename: size} for small test files in a single directory pass"""
+    if not os.path.isdir(directory):
+        return {}
+    with os.scandir(directory) as it:
+        return {e.name: e.stat().st_size for e in it
+                if e.name.startswith('small_file_') and e.is_file()}
 
-def verify_file_integrity(original_path, downloaded_path):
-    """Verify file integrity by comparing MD5 hashes"""
-    original_md5 = calculate_md5(original_path)
-    downloaded_md5 = calculate_md5(downloaded_path)
-    return original_md5 == downloaded_md5
+def _copy_file_in_kernel(src, dst):
+    """Copy src over dst without passing the data through user space"""
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        if hasattr(os, 'copy_file_range'):
+            try:
+                while os.copy_file_range(s.fileno(), d.fileno(), 1 << 30):
+                    pass
+                return
+            except OSError:
+                # Older kernels or filesystems without support; start over
+                d.seek(0)
+                d.truncate()
+    # copyfile uses sendfile on Linux and fcopyfile on macOS
+    shutil.copyfile(src, dst)
+
+def replace_with_download(download_path, original_path):
+    """Move a downloaded file over the original, copying in-kernel across filesystems"""
+    try:
+        os.replace(download_path, original_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        _copy_file_in_kernel(download_path, original_path)
+        os.remove(download_path)
 
 def cleanup_downloads():
     """Remove downloaded files"""
@@ -145,8 +466,8 @@ def cleanup_downloads():
     if os.path.exists(download_dir):
         shutil.rmtree(download_dir)
 
-def download_file(s3_client, filename, replace_original=False):
-    """Download a single file from S3"""
+def get_download_path(filename, replace_original=False):
+    """Return the local path for a download, creating its directory"""
     if replace_original:
         download_path = os.path.join(DATA_DIR, filename)
     else:
@@ -156,9 +477,377 @@ def download_file(s3_client, filename, replace_original=False):
     
     # Ensure parent directory exists
     os.makedirs(os.path.dirname(download_path), exist_ok=True)
-    s3_client.download_file(BUCKET_NAME, filename, download_path)
     return download_path
 
+def _preallocate(fd, size):
+    """Reserve size bytes for fd up front so writes don't grow the file"""
+    if hasattr(os, 'posix_fallocate'):
+        os.posix_fallocate(fd, 0, size)
+    else:
+        os.ftruncate(fd, size)
+
+def download_file(transfer_manager, filename, replace_original=False, key=None, preallocate=False):
+    """Download a single file from S3, returning its path and content hash"""
+    download_path = get_download_path(filename, replace_original)
+    key = key or filename
+    # Hash while the bytes arrive instead of re-reading the file afterwards.
+    # The writer isn't seekable, so the transfer manager delivers parts in order.
+    h = new_hasher()
+    head = None
+    if preallocate:
+        # Costs a HEAD, so only worth it for large objects
+        head = transfer_manager.client.head_object(Bucket=BUCKET_NAME, Key=key)
+    if head and head['ContentLength']:
+        # Write into a preallocated memory map instead of a growing file
+        size = head['ContentLength']
+        fd = os.open(download_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            _preallocate(fd, size)
+            with mmap.mmap(fd, size) as mm:
+                writer = HashingWriter(mm, h, size)
+                transfer_manager.download(BUCKET_NAME, key, writer,
+                                          subscribers=[ProvideSizeSubscriber(size)]).result()
+        finally:
+            os.close(fd)
+        if writer.written != size:
+            raise ValueError(f"Object changed size during download ({writer.written} of {size} bytes)")
+    else:
+        with open(download_path, 'wb') as fh:
+            transfer_manager.download(BUCKET_NAME, key, HashingWriter(fh, h)).result()
+    return download_path, h.hexdigest()
+
+async def _upload_small_file(sem, s3, item):
+    """Upload a single (filepath, key) small file on the async client"""
+    filepath, key = item
+    async with sem:
+        with open(filepath, 'rb') as f:
+            body = f.read()
+        await s3.put_object(Bucket=BUCKET_NAME, Key=key, Body=body)
+    return key
+
+async def _download_small_file(sem, s3, item, replace_original):
+    """Download a single (filename, key) small file on the async client, returning its path and hash"""
+    filename, key = item
+    download_path = get_download_path(filename, replace_original)
+    async with sem:
+        response = await s3.get_object(Bucket=BUCKET_NAME, Key=key)
+        async with response['Body'] as stream:
+            body = await stream.read()
+    h = new_hasher()
+    h.update(body)
+    with open(download_path, 'wb') as fh:
+        fh.write(body)
+    return download_path, h.hexdigest()
+
+async def _run_small_file_transfers(transfer, items, desc, *transfer_args):
+    """Run one async transfer per item, bounded by a semaphore"""
+    session = aioboto3.Session()
+    # Same retry policy as the shared sync client; aiohttp keeps pooled
+    # connections alive on its own
+    config = AioConfig(
+        max_pool_connections=SMALL_FILE_ASYNC_CONCURRENCY,
+        retries={'mode': 'adaptive', 'max_attempts': 10},
+    )
+    async with session.client('s3', config=config, **dict(S3_CONFIG)) as s3:
+        sem = asyncio.Semaphore(SMALL_FILE_ASYNC_CONCURRENCY)
+        return await async_tqdm.gather(
+            *[transfer(sem, s3, item, *transfer_args) for item in items],
+            total=len(items), desc=desc, **PROGRESS_OPTIONS,
+        )
+
+@lru_cache(maxsize=1)
+def _get_worker_s3_client():
+    """Return the S3 client owned by the current worker process"""
+    # Kept apart from the parent's client, whose pooled sockets a forked
+    # worker must not share
+    return boto3.client('s3', **S3_CONFIG)
+
+def _split_ranges(size, parts):
+    """Split size bytes into (start, length) ranges for at most parts workers"""
+    part_size = max(-(-size // parts), MIN_PART_SIZE)
+    return [(start, min(part_size, size - start)) for start in range(0, size, part_size)]
+
+def _upload_range(filepath, key, upload_id, part_number, start, length):
+    """Upload one byte range of a file as a multipart part (runs in a worker process)"""
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        body = f.read(length)
+    response = _get_worker_s3_client().upload_part(
+        Bucket=BUCKET_NAME, Key=key, UploadId=upload_id,
+        PartNumber=part_number, Body=body,
+    )
+    return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+def _download_range(download_path, key, start, length, chunk_size=1 * MB):
+    """Download one byte range of an object into place (runs in a worker process)"""
+    response = _get_worker_s3_client().get_object(
+        Bucket=BUCKET_NAME, Key=key, Range=f'bytes={start}-{start + length - 1}',
+    )
+    with open(download_path, 'r+b') as f:
+        f.seek(start)
+        for chunk in response['Body'].iter_chunks(chunk_size):
+            f.write(chunk)
+    return length
+
+def multiprocess_upload_file(args, filepath):
+    """Upload a file as a multipart upload split across worker processes"""
+    # Each process has its own client, so TLS encryption and buffer copies
+    # aren't serialized on the GIL
+    s3_client = get_s3_client(args)
+    key = os.path.basename(filepath)
+    ranges = _split_ranges(os.path.getsize(filepath), args.concurrency)
+    upload_id = s3_client.create_multipart_upload(Bucket=BUCKET_NAME, Key=key)['UploadId']
+    try:
+        with ProcessPoolExecutor() as executor:
+            futures = [
+                executor.submit(_upload_range, filepath, key, upload_id, part_number, start, length)
+                for part_number, (start, length) in enumerate(ranges, start=1)
+            ]
+            parts = [future.result() for future in futures]
+        s3_client.complete_multipart_upload(
+            Bucket=BUCKET_NAME, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': parts},
+        )
+    except BaseException:
+        s3_client.abort_multipart_upload(Bucket=BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
+    return key
+
+def _hash_range(filepath, start, length, chunk_size=1 * MB):
+    """Hash one byte range of a file"""
+    h = new_hasher()
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            h.update(chunk)
+            length -= len(chunk)
+    return h.hexdigest()
+
+def delta_upload_file(args, filepath):
+    """Multipart-upload a file, copying parts unchanged since the last delta upload server-side"""
+    s3_client = get_s3_client(args)
+    key = os.path.basename(filepath)
+    part_size = args.part_size_mb * MB
+    size = os.path.getsize(filepath)
+    ranges = [(start, min(part_size, size - start)) for start in range(0, size, part_size)]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        part_hashes = list(executor.map(lambda r: _hash_range(filepath, *r), ranges))
+    
+    previous = load_part_hashes(key)
+    if previous and previous['part_size'] != part_size:
+        previous = None
+    previous_parts = previous['parts'] if previous else []
+    
+    upload_id = s3_client.create_multipart_upload(Bucket=BUCKET_NAME, Key=key)['UploadId']
+    
+    def send(part_number, start, length, part_hash):
+        if part_number <= len(previous_parts) and previous_parts[part_number - 1] == part_hash:
+            # CopySourceIfMatch makes sure the object is still the one we hashed
+            try:
+                response = s3_client.upload_part_copy(
+                    Bucket=BUCKET_NAME, Key=key, UploadId=upload_id, PartNumber=part_number,
+                    CopySource={'Bucket': BUCKET_NAME, 'Key': key},
+                    CopySourceRange=f'bytes={start}-{start + length - 1}',
+                    CopySourceIfMatch=previous['etag'],
+                )
+                return {'PartNumber': part_number, 'ETag': response['CopyPartResult']['ETag']}, True
+            except ClientError as e:
+                # The object was replaced or deleted outside this script; send the part instead
+                if e.response['Error']['Code'] not in ('PreconditionFailed', 'NoSuchKey'):
+                    raise
+        # Stream the part from disk rather than buffering it per thread
+        with ReadFileChunk.from_filename(filepath, start, length) as body:
+            response = s3_client.upload_part(
+                Bucket=BUCKET_NAME, Key=key, UploadId=upload_id, PartNumber=part_number, Body=body,
+            )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}, False
+    
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(
+                lambda part: send(part[0], *part[1], part[2]),
+                zip(range(1, len(ranges) + 1), ranges, part_hashes),
+            ))
+        response = s3_client.complete_multipart_upload(
+            Bucket=BUCKET_NAME, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [part for part, _ in results]},
+        )
+    except BaseException:
+        s3_client.abort_multipart_upload(Bucket=BUCKET_NAME, Key=key, UploadId=upload_id)
+        raise
+    
+    save_part_hashes(key, {'etag': response['ETag'], 'part_size': part_size, 'parts': part_hashes})
+    reused = sum(1 for _, copied in results if copied)
+    print(f"Reused {reused}/{len(results)} unchanged parts")
+    return key
+
+def multiprocess_download_file(args, filename, replace_original=False):
+    """Download a file with ranged GETs across worker processes, returning its path"""
+    s3_client = get_s3_client(args)
+    download_path = get_download_path(filename, replace_original)
+    size = s3_client.head_object(Bucket=BUCKET_NAME, Key=filename)['ContentLength']
+    with open(download_path, 'wb') as f:
+        f.truncate(size)
+    with ProcessPoolExecutor() as executor:
+        futures = [
+            executor.submit(_download_range, download_path, filename, start, length)
+            for start, length in _split_ranges(size, args.concurrency)
+        ]
+        for future in futures:
+            future.result()
+    return download_path
+
+def _fetch_range(s3_client, fd, key, etag, start, length, claimed, slot, chunk_size=1 * MB):
+    """Write one byte range of an object into fd, returning False if abandoned"""
+    # IfMatch pins every attempt to the same object version, so a hedged
+    # duplicate writes identical bytes and the two can safely overlap
+    response = s3_client.get_object(
+        Bucket=BUCKET_NAME, Key=key, IfMatch=etag, Range=f'bytes={start}-{start + length - 1}',
+    )
+    body = response['Body']
+    # Published so the driver can close the body out from under a stalled read
+    slot['body'] = body
+    offset = start
+    try:
+        for chunk in body.iter_chunks(chunk_size):
+            if claimed.is_set():
+                return False
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
+    finally:
+        # Releases the connection when the other attempt has already won
+        body.close()
+    return True
+
+def hedged_download_file(args, filename, replace_original=False):
+    """Download a file with ranged GETs, hedging parts that straggle behind the rest"""
+    s3_client = get_s3_client(args)
+    download_path = get_download_path(filename, replace_original)
+    head = s3_client.head_object(Bucket=BUCKET_NAME, Key=filename)
+    size = head['ContentLength']
+    ranges = _split_ranges(size, args.concurrency)
+    claimed = [threading.Event() for _ in ranges]
+    attempts = {}  # future -> (range index, start time, {'body': streaming body})
+    durations = []
+    hedged = set()
+    
+    fd = os.open(download_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    # Room for every part plus one hedge each, so hedges never queue
+    executor = ThreadPoolExecutor(max_workers=2 * len(ranges) or 1)
+    
+    def submit(index):
+        start, length = ranges[index]
+        slot = {}
+        future = executor.submit(_fetch_range, s3_client, fd, filename, head['ETag'],
+                                 start, length, claimed[index], slot)
+        attempts[future] = (index, time.time(), slot)
+    
+    def close_losers(index=None):
+        # Closing the body releases the connection of an attempt that lost,
+        # even one stuck waiting on a stalled socket
+        for i, _, slot in list(attempts.values()):
+            if (index is None or i == index) and 'body' in slot:
+                slot['body'].close()
+    
+    def close_fd_when_idle():
+        # Stragglers may still be mid-write, so fd outlives the download
+        executor.shutdown(wait=True)
+        os.close(fd)
+    
+    try:
+        os.ftruncate(fd, size)
+        for index in range(len(ranges)):
+            submit(index)
+        
+        while not all(event.is_set() for event in claimed):
+            done, _ = wait(attempts, timeout=HEDGE_CHECK_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, started_at, _ = attempts.pop(future)
+                try:
+                    completed = future.result()
+                except Exception:
+                    # A failed attempt is fine if its twin already won or is still running
+                    if claimed[index].is_set() or any(i == index for i, _, _ in attempts.values()):
+                        continue
+                    raise
+                if completed and not claimed[index].is_set():
+                    claimed[index].set()
+                    durations.append(time.time() - started_at)
+                    close_losers(index)
+            
+            if durations:
+                threshold = HEDGE_SLOWDOWN * statistics.median(durations)
+                now = time.time()
+                for index, started_at, _ in list(attempts.values()):
+                    if index not in hedged and not claimed[index].is_set() and now - started_at > threshold:
+                        hedged.add(index)
+                        submit(index)
+    finally:
+        for event in claimed:
+            event.set()
+        close_losers()
+        # Don't wait on stragglers: their tail is exactly what hedging avoids
+        executor.shutdown(wait=False, cancel_futures=True)
+        threading.Thread(target=close_fd_when_idle, daemon=True).start()
+    
+    if hedged:
+        print(f"Hedged {len(hedged)} straggling part(s)")
+    return download_path
+
+def upload_small_files(transfer_manager, filepaths, keys):
+    """Upload many small files concurrently under the given keys"""
+    if aioboto3 is not None:
+        return asyncio.run(_run_small_file_transfers(
+            _upload_small_file, list(zip(filepaths, keys)), "Uploading"))
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(upload_file, transfer_manager, f, k) for f, k in zip(filepaths, keys)]
+        # Tick per completion so one slow request doesn't stall the bar
+        return [future.result() for future in tqdm(as_completed(futures), total=len(futures),
+                                                   desc="Uploading", **PROGRESS_OPTIONS)]
+
+def download_small_files(transfer_manager, filenames, keys, replace_original=False):
+    """Download many small files concurrently, returning (path, hash) pairs in completion order"""
+    if aioboto3 is not None:
+        return asyncio.run(_run_small_file_transfers(
+            _download_small_file, list(zip(filenames, keys)), "Downloading", replace_original))
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(download_file, transfer_manager, f, replace_original, k)
+                   for f, k in zip(filenames, keys)]
+        return [future.result() for future in tqdm(as_completed(futures), total=len(futures),
+                                                   desc="Downloading", **PROGRESS_OPTIONS)]
+
+def upload_packed_small_files(transfer_manager, filepaths):
+    """Upload small files as one tar archive object"""
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w') as tar:
+        for filepath in filepaths:
+            tar.add(filepath, arcname=os.path.basename(filepath))
+    buf.seek(0)
+    transfer_manager.upload(buf, BUCKET_NAME, PACKED_SMALL_FILES_KEY).result()
+    return PACKED_SMALL_FILES_KEY
+
+def download_packed_small_files(args, replace_original=False):
+    """Download and unpack the small-file archive, returning (path, hash) pairs"""
+    response = get_s3_client(args).get_object(Bucket=BUCKET_NAME, Key=PACKED_SMALL_FILES_KEY)
+    downloaded = []
+    # Stream mode reads members straight off the response body without
+    # buffering the whole archive
+    with tarfile.open(fileobj=response['Body'], mode='r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            body = tar.extractfile(member).read()
+            download_path = get_download_path(os.path.basename(member.name), replace_original)
+            h = new_hasher()
+            h.update(body)
+            with open(download_path, 'wb') as fh:
+                fh.write(body)
+            downloaded.append((download_path, h.hexdigest()))
+    return downloaded
+
 def measure_transfer_speed(operation_name, start_time, total_size):
     """Calculate and return transfer speed metrics"""
     duration = time.time() - start_time
@@ -169,72 +858,141 @@ def create_test_files(args):
     """Create test files based on arguments"""
     ensure_data_directory()
     
-    if args.large or args.all:
-        create_large_file('large_file.dat', args.size)
+    if (args.large or args.all) and not streams_large_upload(args):
+        invalidate_hash_cache(['large_file.dat'])
+        large_path = os.path.join(DATA_DIR, 'large_file.dat')
+        if args.modified and os.path.exists(large_path):
+            mutate_large_file(large_path)
+        else:
+            create_large_file('large_file.dat', args.size)
     
     if args.small or args.all:
+        invalidate_hash_cache([f'small_file_{i}.txt' for i in range(SMALL_FILE_COUNT)])
         create_small_files()
 
 def upload_test_files(args):
     """Upload test files based on arguments"""
-    s3_client = get_s3_client()
+    transfer_manager = get_transfer_manager(args)
+    hash_cache = load_hash_cache()
     
-    if args.large or args.all:
-        filepath = os.path.join(DATA_DIR, 'large_file.dat')
-        if os.path.exists(filepath):
-            file_size = os.path.getsize(filepath)
-            print("\nUploading large file...")
-            # Calculate and print hash before upload
-            print(f"Source file MD5: {calculate_md5(filepath)}")
-            start_time = time.time()
-            upload_file(s3_client, filepath)
-            print(measure_transfer_speed("Upload", start_time, file_size))
-        else:
-            print("Large file not found. Run with --create first.")
+    with transfer_manager:
+        if args.large or args.all:
+            filepath = os.path.join(DATA_DIR, 'large_file.dat')
+            if streams_large_upload(args):
+                # Generate straight into the upload; the transfer manager reads
+                # unseekable sources in order, so the hash stays valid
+                print(f"\nStreaming random large file upload ({args.size/1024/1024/1024:.2f} GB)...")
+                source = RandomSource(args.size, new_hasher())
+                start_time = time.time()
+                transfer_manager.upload(source, BUCKET_NAME, 'large_file.dat').result()
+                print(measure_transfer_speed("Upload", start_time, args.size))
+                hash_cache['large_file.dat'] = source.h.hexdigest()
+                save_hash_cache(hash_cache)
+                save_part_hashes('large_file.dat', None)
+                print(f"Source file {HASH_NAME}: {hash_cache['large_file.dat']}")
+            elif os.path.exists(filepath):
+                file_size = os.path.getsize(filepath)
+                print("\nUploading large file...")
+                # Calculate, cache and print hash before upload
+                hash_cache['large_file.dat'] = calculate_hash(filepath)
+                save_hash_cache(hash_cache)
+                print(f"Source file {HASH_NAME}: {hash_cache['large_file.dat']}")
+                start_time = time.time()
+                if args.modified:
+                    delta_upload_file(args, filepath)
+                else:
+                    if args.multiprocess:
+                        multiprocess_upload_file(args, filepath)
+                    elif use_crt(args):
+                        crt_upload_file(args, filepath)
+                    else:
+                        upload_file(transfer_manager, filepath)
+                    # The object no longer matches any recorded part layout
+                    save_part_hashes('large_file.dat', None)
+                print(measure_transfer_speed("Upload", start_time, file_size))
+            else:
+                print("Large file not found. Run with --create first.")
     
-    if args.small or args.all:
-        filepaths = [os.path.join(DATA_DIR, f'small_file_{i}.txt') for i in range(SMALL_FILE_COUNT)]
-        if os.path.exists(filepaths[0]):
-            total_size = sum(os.path.getsize(f) for f in filepaths if os.path.exists(f))
-            print(f"\nUploading {SMALL_FILE_COUNT} small files...")
-            start_time = time.time()
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                list(tqdm(executor.map(lambda f: upload_file(s3_client, f), filepaths), total=len(filepaths)))
-            print(measure_transfer_speed("Upload", start_time, total_size))
-        else:
-            print("Small files not found. Run with --create first.")
+        if args.small or args.all:
+            sizes = scan_small_files()
+            indices = [i for i in range(SMALL_FILE_COUNT) if f'small_file_{i}.txt' in sizes]
+            if indices:
+                filepaths = [os.path.join(DATA_DIR, f'small_file_{i}.txt') for i in indices]
+                total_size = sum(sizes[os.path.basename(f)] for f in filepaths)
+                # Hash sources once so repeated downloads don't re-read them
+                print("Hashing source files...")
+                with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                    hashes = executor.map(calculate_hash, filepaths)
+                    hash_cache.update(zip((os.path.basename(f) for f in filepaths), hashes))
+                save_hash_cache(hash_cache)
+                print(f"\nUploading {SMALL_FILE_COUNT} small files...")
+                start_time = time.time()
+                if args.pack:
+                    upload_packed_small_files(transfer_manager, filepaths)
+                else:
+                    keys = [_shard_key(i) for i in indices]
+                    upload_small_files(transfer_manager, filepaths, keys)
+                print(measure_transfer_speed("Upload", start_time, total_size))
+            else:
+                print("Small files not found. Run with --create first.")
 
 def download_test_files(args):
     """Download test files based on arguments"""
-    s3_client = get_s3_client()
+    # One transfer manager is reused across all --times iterations so its
+    # thread pool and connections stay warm
+    transfer_manager = get_transfer_manager(args)
+    crt_manager = get_crt_transfer_manager(args) if (args.large or args.all) and use_crt(args) else None
+    hash_cache = load_hash_cache()
     integrity_failures = []
     
     try:
         if args.large or args.all:
             speeds = []
+            # Use the hash cached at upload time, hashing the original at most once
+            original_path = os.path.join(DATA_DIR, 'large_file.dat')
+            original_hash = hash_cache.get('large_file.dat')
+            if original_hash is None and os.path.exists(original_path):
+                original_hash = calculate_hash(original_path)
+            if original_hash is not None:
+                print(f"Original file {HASH_NAME}: {original_hash}")
+            
             for i in range(args.times):
                 print(f"\nDownloading large file (iteration {i+1}/{args.times})...")
                 try:
                     start_time = time.time()
-                    original_path = os.path.join(DATA_DIR, 'large_file.dat')
-                    if os.path.exists(original_path) and i == 0 and not args.replace_original:
-                        print(f"Original file MD5: {calculate_md5(original_path)}")
                     
                     # Only replace original on last iteration if replace_original is True
                     replace_this_time = args.replace_original and (i == args.times - 1)
-                    download_path = download_file(s3_client, 'large_file.dat', replace_this_time)
+                    # Always download beside the original, so a failed download can't clobber it
+                    if args.hedge:
+                        download_path, downloaded_hash = hedged_download_file(args, 'large_file.dat'), None
+                    elif args.multiprocess:
+                        download_path, downloaded_hash = multiprocess_download_file(args, 'large_file.dat'), None
+                    elif crt_manager is not None:
+                        download_path, downloaded_hash = crt_download_file(crt_manager, 'large_file.dat'), None
+                    else:
+                        download_path, downloaded_hash = download_file(transfer_manager, 'large_file.dat',
+                                                                       preallocate=True)
                     file_size = os.path.getsize(download_path)
                     duration = time.time() - start_time
                     speed_mbps = (file_size / 1024 / 1024) / duration
                     speeds.append(speed_mbps)
                     
-                    print(f"Downloaded file MD5: {calculate_md5(download_path)}")
+                    if downloaded_hash is None:
+                        # Out-of-order transfers can't hash in flight; do it outside the timed section
+                        downloaded_hash = calculate_hash(download_path)
+                    
+                    if replace_this_time:
+                        replace_with_download(download_path, original_path)
+                        download_path = original_path
+                    
+                    print(f"Downloaded file {HASH_NAME}: {downloaded_hash}")
                     print(f"Download Speed: {speed_mbps:.2f} MB/s (Duration: {duration:.2f}s)")
                     
                     # Verify integrity if original exists and we're not replacing it
-                    if os.path.exists(original_path) and not replace_this_time:
+                    if original_hash is not None and not replace_this_time:
                         print("Verifying file integrity...")
-                        if verify_file_integrity(original_path, download_path):
+                        if downloaded_hash == original_hash:
                             print("✓ Large file integrity verified")
                         else:
                             print("✗ Large file integrity check failed")
@@ -249,7 +1007,7 @@ def download_test_files(args):
                     print(f"Error downloading large file: {e}")
             
             # Print statistics for multiple downloads
-            if args.times > 1:
+            if args.times > 1 and speeds:
                 print("\nLarge file download statistics:")
                 print(f"Average speed: {sum(speeds)/len(speeds):.2f} MB/s")
                 print(f"Max speed: {max(speeds):.2f} MB/s")
@@ -260,30 +1018,29 @@ def download_test_files(args):
             print(f"\nDownloading {SMALL_FILE_COUNT} small files...")
             try:
                 start_time = time.time()
-                with ThreadPoolExecutor(max_workers=10) as executor:
-                    downloaded = list(tqdm(executor.map(
-                        lambda f: download_file(s3_client, f, args.replace_original), 
-                        filenames
-                    ), total=len(filenames), desc="Downloading"))
-                total_size = sum(os.path.getsize(f) for f in downloaded)
+                if args.pack:
+                    downloaded = download_packed_small_files(args, args.replace_original)
+                else:
+                    keys = [_shard_key(i) for i in range(SMALL_FILE_COUNT)]
+                    downloaded = download_small_files(transfer_manager, filenames, keys, args.replace_original)
+                total_size = sum(os.path.getsize(path) for path, _ in downloaded)
+                downloaded_hashes = {os.path.basename(path): h for path, h in downloaded}
                 print(measure_transfer_speed("Download", start_time, total_size))
                 
                 # Verify integrity only if not replacing originals
                 if not args.replace_original:
                     print("Verifying files integrity...")
-                    verified_count = 0
-                    failed_count = 0
-                    with tqdm(total=len(filenames), desc="Verifying") as pbar:
-                        for i, filename in enumerate(filenames):
-                            original_path = os.path.join(DATA_DIR, filename)
-                            download_path = os.path.join(DATA_DIR, 'downloads', filename)
-                            if os.path.exists(original_path):
-                                if verify_file_integrity(original_path, download_path):
-                                    verified_count += 1
-                                else:
-                                    failed_count += 1
-                                    integrity_failures.append(filename)
-                            pbar.update(1)
+                    originals = scan_small_files()
+                    checkable = [f for f in filenames if f in hash_cache or f in originals]
+                    # Hashing releases the GIL, so uncached originals are read in parallel
+                    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                        results = list(tqdm(executor.map(
+                            lambda f: (f, verify_file_integrity(f, downloaded_hashes.get(f), hash_cache)),
+                            checkable
+                        ), total=len(checkable), desc="Verifying", **PROGRESS_OPTIONS))
+                    verified_count = sum(1 for _, ok in results if ok)
+                    failed_count = len(results) - verified_count
+                    integrity_failures.extend(f for f, ok in results if not ok)
                     
                     print(f"✓ {verified_count} files verified successfully")
                     if failed_count > 0:
@@ -299,6 +1056,10 @@ def download_test_files(args):
             for filename in integrity_failures:
                 print(f"- {filename}")
         
+        transfer_manager.shutdown()
+        if crt_manager is not None:
+            crt_manager.shutdown()
+        
         # Cleanup downloaded files only if not replacing originals
         if not args.replace_original:
             print("\nCleaning up downloaded files...")
@@ -309,8 +1070,7 @@ def list_bucket_contents(args):
     """List contents of the bucket with optional metadata query"""
     print(f"\nListing contents of bucket '{BUCKET_NAME}'...")
     
-    # Create S3 service client
-    svc = boto3.client("s3", **S3_CONFIG)
+    svc = get_s3_client(args)
     
     # Register metadata query if provided
     if args.query:
@@ -321,36 +1081,51 @@ def list_bucket_contents(args):
             lambda request, **kwargs: _x_tigris_query(request, args.query),
         )
     
+    def _head(key):
+        try:
+            return svc.head_object(Bucket=BUCKET_NAME, Key=key)
+        except Exception as e:
+            return e
+    
     try:
-        response = svc.list_objects_v2(Bucket=BUCKET_NAME)
+        # Paginate so buckets with more than 1000 objects are listed in full
+        paginator = svc.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=BUCKET_NAME):
+            objects.extend(page.get('Contents', []))
         
-        if 'Contents' in response:
+        if objects:
+            # LIST already carries size, date and ETag; HeadObject is only needed
+            # for content type and user metadata, so fetch those in parallel
+            heads = {}
+            if args.query or args.metadata:
+                keys = [obj['Key'] for obj in objects]
+                with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    heads = dict(zip(keys, executor.map(_head, keys)))
+            
             total_size = 0
             print("\nObjects:")
-            for obj in response['Contents']:
+            for obj in objects:
                 size_mb = obj['Size'] / (1024 * 1024)
                 key = obj['Key']
                 print(f"\n  {key} ({size_mb:.2f} MB)")
+                print("  Metadata:")
+                print(f"    Last Modified: {obj.get('LastModified')}")
+                etag = obj.get('ETag', '').strip('"')
+                print(f"    ETag: {etag}")
                 
-                # Get metadata using HeadObject
-                try:
-                    head = svc.head_object(Bucket=BUCKET_NAME, Key=key)
-                    print("  Metadata:")
-                    print(f"    Last Modified: {head.get('LastModified')}")
-                    # print(f"    ETag: {head.get('ETag', '').strip('\"')}")
-                    etag = head.get('ETag', '').strip('"')
-                    print(f"    ETag: {etag}")
-                    
+                head = heads.get(key)
+                if isinstance(head, Exception):
+                    print(f"    Error getting metadata: {head}")
+                elif head is not None:
                     print(f"    Content Type: {head.get('ContentType', 'not set')}")
                     if 'Metadata' in head:
                         for k, v in head['Metadata'].items():
                             print(f"    {k}: {v}")
-                except Exception as e:
-                    print(f"    Error getting metadata: {e}")
                 
                 total_size += obj['Size']
             
-            print(f"\nTotal objects: {len(response['Contents'])}")
+            print(f"\nTotal objects: {len(objects)}")
             print(f"Total size: {total_size / (1024 * 1024 * 1024):.2f} GB")
         else:
             print("Bucket is empty")
@@ -362,6 +1137,9 @@ def main():
     """Main function to run tests based on CLI arguments"""
     args = parse_args()
     
+    if args.big_socket_buf:
+        enable_big_socket_buffer()
+    
     try:
         if args.list:
             list_bucket_contents(args)